@@ -1,20 +1,21 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
 from sqlalchemy import text
 from datetime import datetime
 import os
+import errno
 import uuid
 import hashlib
 import secrets
 import base64
-import smtplib
-from email.message import EmailMessage
 import urllib.parse
-import urllib.request
 import re
-from PIL import Image, ImageFilter
+import shutil
+import threading
+import time
+import click
+from jinja2 import FileSystemBytecodeCache
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-me')
@@ -23,9 +24,26 @@ database_url = os.environ.get('DATABASE_URL')
 if database_url and database_url.startswith('postgres://'):
     database_url = database_url.replace('postgres://', 'postgresql://', 1)
 app.config['SQLALCHEMY_DATABASE_URI'] = database_url or f'sqlite:///{default_db_path}'
+# Threaded workers share one pool per process: drop dead connections and let
+# SQLite writers wait for each other instead of failing with "database is locked".
+if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 30}}
+else:
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'pool_pre_ping': True, 'pool_size': 10, 'max_overflow': 5}
 app.config['UPLOAD_FOLDER'] = os.path.join(app.static_folder, 'img', 'uploads')
+app.config['UPLOAD_TMP_FOLDER'] = os.path.join(app.instance_path, 'upload_tmp')
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
 app.config['RESET_TOKEN_TTL_SECONDS'] = 60 * 30
+app.config['PORTFOLIO_PAGE_SIZE'] = int(os.environ.get('PORTFOLIO_PAGE_SIZE', '6'))
+app.config['JINJA_BYTECODE_CACHE_DIR'] = os.environ.get('JINJA_BYTECODE_CACHE_DIR') or os.path.join(app.instance_path, 'jinja_cache')
+
+# Compiled templates are shared on disk so every worker does not recompile them on boot.
+if os.environ.get('JINJA_BYTECODE_CACHE', '1') == '1':
+    os.makedirs(app.config['JINJA_BYTECODE_CACHE_DIR'], exist_ok=True)
+    app.jinja_options = {
+        **app.jinja_options,
+        'bytecode_cache': FileSystemBytecodeCache(app.config['JINJA_BYTECODE_CACHE_DIR']),
+    }
 
 db = SQLAlchemy(app)
 
@@ -39,6 +57,9 @@ def _hash_token(token: str) -> str:
     return hashlib.sha256(token.encode('utf-8')).hexdigest()
 
 def _send_reset_email(to_email: str, reset_url: str) -> bool:
+    import smtplib
+    from email.message import EmailMessage
+
     smtp_host = os.environ.get('SMTP_HOST')
     if not smtp_host:
         return False
@@ -69,6 +90,8 @@ def _send_reset_email(to_email: str, reset_url: str) -> bool:
     return True
 
 def _send_reset_sms(to_phone: str, reset_url: str) -> bool:
+    import urllib.request
+
     sid = os.environ.get('TWILIO_ACCOUNT_SID')
     token = os.environ.get('TWILIO_AUTH_TOKEN')
     from_number = os.environ.get('TWILIO_FROM_NUMBER')
@@ -139,6 +162,176 @@ class PasswordReset(db.Model):
     used_at = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
+# --- Attachments ---
+# Uploads are stored once per content under UPLOAD_FOLDER/ab/cd/<sha256><ext>.
+# QuoteRequest.image_filename holds that relative path; the quotes pointing at
+# a file are its references, and gc_attachments() removes files with none.
+
+ATTACHMENT_CHUNK_SIZE = 64 * 1024
+ATTACHMENT_GC_GRACE_SECONDS = 60 * 60
+_ATTACHMENT_NAME_RE = re.compile(r'^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.[a-z0-9]+$')
+# Spellings of the same file type share one stored copy.
+_ATTACHMENT_EXT_ALIASES = {'.jpeg': '.jpg'}
+
+def _attachment_path(digest: str, ext: str) -> str:
+    ext = ext.lower()
+    ext = _ATTACHMENT_EXT_ALIASES.get(ext, ext)
+    return f'{digest[:2]}/{digest[2:4]}/{digest}{ext}'
+
+def _move_into_place(tmp_path: str, final_path: str) -> None:
+    # Only ever rename into place so a partial file is never served under its
+    # content name; across filesystems, copy to a hidden .part name first.
+    final_dir = os.path.dirname(final_path)
+    for attempt in range(2):
+        os.makedirs(final_dir, exist_ok=True)
+        try:
+            try:
+                os.replace(tmp_path, final_path)
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                part_path = os.path.join(final_dir, f'.{uuid.uuid4().hex}.part')
+                shutil.copyfile(tmp_path, part_path)
+                os.replace(part_path, final_path)
+            return
+        except FileNotFoundError:
+            # gc_attachments() pruned the empty shard directory in between.
+            if attempt:
+                raise
+
+def _store_attachment(stream, ext: str) -> str:
+    upload_root = app.config['UPLOAD_FOLDER']
+    tmp_dir = app.config['UPLOAD_TMP_FOLDER']
+    os.makedirs(tmp_dir, exist_ok=True)
+    tmp_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+
+    digest = hashlib.sha256()
+    try:
+        with open(tmp_path, 'wb') as out:
+            while True:
+                chunk = stream.read(ATTACHMENT_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+
+        relative = _attachment_path(digest.hexdigest(), ext)
+        final_path = os.path.join(upload_root, *relative.split('/'))
+        try:
+            # Same content already stored; refresh its mtime so GC leaves it alone.
+            os.utime(final_path)
+        except FileNotFoundError:
+            _move_into_place(tmp_path, final_path)
+        return relative
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _attachment_refcounts() -> dict:
+    rows = (
+        db.session.query(QuoteRequest.image_filename, db.func.count(QuoteRequest.id))
+        .filter(QuoteRequest.image_filename.isnot(None))
+        .group_by(QuoteRequest.image_filename)
+        .all()
+    )
+    return {name: count for name, count in rows}
+
+def _still_collectable(relative: str, full_path: str, cutoff: float) -> bool:
+    # An upload may have reused the file since the scan started.
+    db.session.rollback()
+    if QuoteRequest.query.filter_by(image_filename=relative).first() is not None:
+        return False
+    try:
+        return os.path.getmtime(full_path) <= cutoff
+    except FileNotFoundError:
+        return False
+
+def _remove_file(full_path: str) -> bool:
+    try:
+        os.remove(full_path)
+        return True
+    except FileNotFoundError:
+        return False
+
+# Files newer than the grace period are kept so an upload whose quote is not
+# committed yet survives; stale staging and .part files go on the same terms.
+def gc_attachments(dry_run: bool = False) -> list:
+    upload_root = app.config['UPLOAD_FOLDER']
+    tmp_dir = app.config['UPLOAD_TMP_FOLDER']
+    referenced = _attachment_refcounts()
+    cutoff = datetime.now().timestamp() - ATTACHMENT_GC_GRACE_SECONDS
+    removed = []
+    if os.path.isdir(tmp_dir):
+        for f in sorted(os.listdir(tmp_dir)):
+            full_path = os.path.join(tmp_dir, f)
+            if not os.path.isfile(full_path) or os.path.getmtime(full_path) > cutoff:
+                continue
+            if dry_run or _remove_file(full_path):
+                removed.append(f'upload_tmp/{f}')
+    for dirpath, dirnames, filenames in os.walk(upload_root):
+        for f in filenames:
+            full_path = os.path.join(dirpath, f)
+            relative = os.path.relpath(full_path, upload_root).replace(os.sep, '/')
+            is_part = f.startswith('.') and f.endswith('.part')
+            if not is_part and (not _ATTACHMENT_NAME_RE.match(relative) or relative in referenced):
+                continue
+            if os.path.getmtime(full_path) > cutoff:
+                continue
+            if dry_run:
+                removed.append(relative)
+                continue
+            if not is_part and not _still_collectable(relative, full_path, cutoff):
+                continue
+            if not _remove_file(full_path):
+                continue
+            removed.append(relative)
+            for shard_dir in (dirpath, os.path.dirname(dirpath)):
+                try:
+                    os.rmdir(shard_dir)
+                except OSError:
+                    break
+    return removed
+
+# Returns (migrated count, names left in place because their extension is not allowed).
+def migrate_attachments() -> tuple:
+    upload_root = app.config['UPLOAD_FOLDER']
+    if not os.path.isdir(upload_root):
+        return 0, []
+    migrated = 0
+    skipped = []
+    for f in sorted(os.listdir(upload_root)):
+        full_path = os.path.join(upload_root, f)
+        if not os.path.isfile(full_path):
+            continue
+        if not _allowed_upload(f):
+            skipped.append(f)
+            continue
+        _, ext = os.path.splitext(f)
+        with open(full_path, 'rb') as src:
+            relative = _store_attachment(src, ext.lower())
+        QuoteRequest.query.filter_by(image_filename=f).update({'image_filename': relative})
+        db.session.commit()
+        os.remove(full_path)
+        migrated += 1
+    return migrated, skipped
+
+@app.cli.command('migrate-uploads')
+def migrate_uploads_command():
+    """Move existing flat uploads into content-addressed storage."""
+    migrated, skipped = migrate_attachments()
+    for f in skipped:
+        print(f'Not migrated (missing or unsupported extension): {f}')
+    print(f'Migrated {migrated} file(s), left {len(skipped)} in place.')
+
+@app.cli.command('gc-uploads')
+@click.option('--dry-run', is_flag=True, help='List orphaned files without deleting them.')
+def gc_uploads_command(dry_run):
+    """Delete uploaded attachments that no quote refers to."""
+    removed = gc_attachments(dry_run=dry_run)
+    for relative in removed:
+        print(relative)
+    print(f"{'Would remove' if dry_run else 'Removed'} {len(removed)} file(s).")
+
 # --- Routes ---
 
 @app.route('/')
@@ -183,15 +376,41 @@ def services():
         grouped_services[cat] = Service.query.filter_by(category=cat).all()
     return render_template('services.html', grouped_services=grouped_services)
 
-@app.route('/portfolio')
-def portfolio():
+PORTFOLIO_IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.gif')
+PORTFOLIO_RESCAN_SECONDS = 60
+_portfolio_cache = {'key': None, 'dir_mtime': None, 'checked_at': 0.0, 'groups': []}
+_portfolio_cache_lock = threading.Lock()
+
+# Image analysis is slow, so groups are cached. A hit costs one stat of the
+# directory; the lock keeps concurrent misses to a single analysis.
+def _portfolio_groups():
     portfolio_dir = os.path.join(app.static_folder, 'img', 'portfolio')
     os.makedirs(portfolio_dir, exist_ok=True)
-    allowed_ext = ('.png', '.jpg', '.jpeg', '.webp', '.gif')
-    file_names = [
-        f for f in sorted(os.listdir(portfolio_dir))
-        if os.path.isfile(os.path.join(portfolio_dir, f)) and f.lower().endswith(allowed_ext)
-    ]
+
+    with _portfolio_cache_lock:
+        dir_mtime = os.stat(portfolio_dir).st_mtime_ns
+        now = time.monotonic()
+        if (
+            _portfolio_cache['key'] is not None
+            and _portfolio_cache['dir_mtime'] == dir_mtime
+            and now - _portfolio_cache['checked_at'] < PORTFOLIO_RESCAN_SECONDS
+        ):
+            return _portfolio_cache['groups']
+
+        file_names = [
+            f for f in sorted(os.listdir(portfolio_dir))
+            if os.path.isfile(os.path.join(portfolio_dir, f)) and f.lower().endswith(PORTFOLIO_IMAGE_EXTENSIONS)
+        ]
+        cache_key = tuple((f, os.path.getmtime(os.path.join(portfolio_dir, f))) for f in file_names)
+        if _portfolio_cache['key'] != cache_key:
+            _portfolio_cache['groups'] = _analyse_portfolio(portfolio_dir, file_names)
+            _portfolio_cache['key'] = cache_key
+        _portfolio_cache['dir_mtime'] = dir_mtime
+        _portfolio_cache['checked_at'] = now
+        return _portfolio_cache['groups']
+
+def _analyse_portfolio(portfolio_dir: str, file_names: list) -> list:
+    from PIL import Image, ImageFilter
 
     def _ahash(image_path: str, size: int = 8) -> int:
         with Image.open(image_path) as img:
@@ -252,15 +471,80 @@ def portfolio():
         before = max(items, key=lambda x: x['edge'])
         after = min(items, key=lambda x: x['edge'])
         extras = [x for x in items if x['file'] not in {before['file'], after['file']}]
+        oldest = min(items, key=lambda x: (x['mtime'], x['file']))
         portfolio_groups.append({
             'before': before['file'],
             'after': after['file'],
             'extras': [x['file'] for x in sorted(extras, key=lambda x: x['mtime'])],
-            'mtime': min(x['mtime'] for x in items),
+            'mtime': oldest['mtime'],
+            'first': oldest['file'],
         })
 
-    portfolio_groups = sorted(portfolio_groups, key=lambda x: x['mtime'])
-    return render_template('portfolio.html', portfolio_groups=portfolio_groups)
+    return sorted(portfolio_groups, key=_portfolio_sort_key)
+
+def _portfolio_sort_key(group) -> tuple:
+    # The oldest photo in a group never changes when newer photos join it,
+    # so this key (and the cursor built from it) survives regrouping.
+    return (group['mtime'], group['first'])
+
+def _portfolio_cursor(group) -> str:
+    mtime, first = _portfolio_sort_key(group)
+    raw = f'{mtime!r}/{first}'.encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def _parse_portfolio_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        mtime, first = raw.split('/', 1)
+        return (float(mtime), first)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+@app.route('/portfolio')
+def portfolio():
+    groups = _portfolio_groups()
+    page_size = app.config['PORTFOLIO_PAGE_SIZE']
+    next_cursor = _portfolio_cursor(groups[page_size - 1]) if len(groups) > page_size else None
+    return render_template('portfolio.html', portfolio_groups=groups[:page_size], next_cursor=next_cursor)
+
+@app.route('/api/portfolio')
+def api_portfolio():
+    groups = _portfolio_groups()
+    cursor = request.args.get('cursor')
+    start = 0
+    if cursor:
+        # The cursor names the last group already shown; resume with the first
+        # group sorting after it, even if that group has since changed or gone.
+        after = _parse_portfolio_cursor(cursor)
+        if after is None:
+            return jsonify({'error': 'Invalid cursor.'}), 400
+        start = next((i for i, g in enumerate(groups) if _portfolio_sort_key(g) > after), len(groups))
+
+    try:
+        limit = int(request.args.get('limit', app.config['PORTFOLIO_PAGE_SIZE']))
+    except ValueError:
+        limit = app.config['PORTFOLIO_PAGE_SIZE']
+    limit = max(1, min(limit, 50))
+
+    page = groups[start:start + limit]
+    end = start + len(page)
+
+    def _url(name):
+        return url_for('static', filename='img/portfolio/' + name)
+
+    response = jsonify({
+        'groups': [
+            {'before': _url(g['before']), 'after': _url(g['after']), 'extras': [_url(x) for x in g['extras']]}
+            for g in page
+        ],
+        'next_cursor': _portfolio_cursor(page[-1]) if page and end < len(groups) else None,
+    })
+    # Pages shift whenever photos are added, so make clients revalidate
+    # (cheap thanks to the ETag) rather than reuse a stale page.
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    response.add_etag()
+    return response.make_conditional(request)
 
 @app.route('/quote', methods=['GET', 'POST'])
 def quote():
@@ -278,12 +562,9 @@ def quote():
                 flash('Only images or PDF files are allowed.', 'danger')
                 return redirect(url_for('quote'))
 
-            safe_original = secure_filename(attachment.filename)
-            _, ext = os.path.splitext(safe_original)
-            unique_name = f'{uuid.uuid4().hex}{ext.lower()}'
-            os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-            attachment.save(os.path.join(app.config['UPLOAD_FOLDER'], unique_name))
-            attachment_filename = unique_name
+            # Use the raw name: secure_filename() would drop the extension of non-ASCII names.
+            _, ext = os.path.splitext(attachment.filename.lower())
+            attachment_filename = _store_attachment(attachment.stream, ext.lower())
 
         new_quote = QuoteRequest(
             full_name=full_name,
@@ -517,6 +798,15 @@ def logout():
     session.pop('user_id', None)
     return redirect(url_for('home'))
 
+# --- Startup ---
+def prewarm_templates():
+    env = app.jinja_env
+    for name in env.list_templates(extensions=['html']):
+        env.get_template(name)
+
+def prewarm_portfolio():
+    _portfolio_groups()
+
 # --- Init DB ---
 def init_db():
     with app.app_context():
@@ -0,0 +1,130 @@
+"""Localhost load test: default gunicorn settings vs gunicorn.conf.py.
+
+Usage:
+    python bench_gunicorn.py [--clients N] [--seconds S] [--paths / /services ...]
+
+The default path mix includes /portfolio, the slow route that blocks a sync
+worker; pass --paths without it to compare fast routes only.
+
+Each setup is started against a throwaway SQLite database, warmed up, then hit
+by N concurrent clients for S seconds. Requests per second and latency
+percentiles are printed for both.
+"""
+import argparse
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+SETUPS = [
+    ('default (1 sync worker)', ['-c', os.devnull]),
+    ('gunicorn.conf.py', ['-c', os.path.join(ROOT, 'gunicorn.conf.py')]),
+]
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_until_up(base_url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(base_url + '/about', timeout=2):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'gunicorn did not come up at {base_url}')
+
+
+def _load(base_url, paths, clients, seconds):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + seconds
+
+    def client(offset):
+        i = offset
+        while time.monotonic() < stop_at:
+            url = base_url + paths[i % len(paths)]
+            i += 1
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(url, timeout=60) as resp:
+                    resp.read()
+                ok = True
+            except OSError:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, errors[0]
+
+
+def run_setup(config_args, paths, clients, seconds):
+    work_dir = tempfile.mkdtemp(prefix='beatwell-bench-')
+    port = _free_port()
+    env = {
+        **os.environ,
+        'DATABASE_URL': f"sqlite:///{os.path.join(work_dir, 'bench.db')}",
+        'JINJA_BYTECODE_CACHE_DIR': os.path.join(work_dir, 'jinja_cache'),
+        'GUNICORN_ACCESS_LOG': os.devnull,
+    }
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', *config_args, '--bind', f'127.0.0.1:{port}', 'wsgi:app'],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        _wait_until_up(base_url)
+        _load(base_url, paths, clients, 1)
+        return _load(base_url, paths, clients, seconds)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--paths', nargs='+', default=['/', '/services', '/portfolio', '/about', '/contact'])
+    args = parser.parse_args()
+
+    for label, config_args in SETUPS:
+        latencies, errors = run_setup(config_args, args.paths, args.clients, args.seconds)
+        if not latencies:
+            print(f'{label}: no successful requests ({errors} errors)')
+            continue
+        latencies.sort()
+        p50 = statistics.median(latencies) * 1000
+        p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+        rps = len(latencies) / args.seconds
+        print(f'{label}: {rps:.1f} req/s, p50 {p50:.1f} ms, p95 {p95:.1f} ms, {errors} errors')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Measure import time and worker boot time for app.py.
+
+Usage:
+    python bench_startup.py [--runs N] [--top N]
+
+Import time comes from `python -X importtime -c "import app"`. Boot time is
+import plus compiling every template, run once with an empty Jinja bytecode
+cache (cold) and once with a filled one (warm), matching what a fresh gunicorn
+worker does.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+BOOT_SNIPPET = "import app; app.prewarm_templates()"
+
+
+def _run(args, env):
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def import_times(env):
+    """Return {module: cumulative_us} from a single -X importtime run."""
+    result = _run(['-X', 'importtime', '-c', 'import app'], env)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative_us)
+    return times
+
+
+def boot_seconds(env):
+    start = time.perf_counter()
+    _run(['-c', BOOT_SNIPPET], env)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp(prefix='beatwell-jinja-')
+    env = {**os.environ, 'JINJA_BYTECODE_CACHE_DIR': cache_dir, 'PYTHONDONTWRITEBYTECODE': '1'}
+
+    try:
+        samples = [import_times(env) for _ in range(args.runs)]
+        total = statistics.median(s.get('app', 0) for s in samples) / 1000
+        print(f'import app: {total:.1f} ms (median of {args.runs})')
+        print('slowest imports (cumulative, ms):')
+        last = samples[-1]
+        for name, us in sorted(last.items(), key=lambda kv: kv[1], reverse=True)[1:args.top + 1]:
+            print(f'  {us / 1000:8.1f}  {name}')
+        for heavy in ('PIL.Image', 'smtplib', 'urllib.request'):
+            print(f'  {heavy}: {"loaded" if heavy in last else "not loaded"}')
+        # Pulled in by werkzeug -> http.client, so deferring it in app.py cannot help.
+        print(f'  email.message: {"loaded" if "email.message" in last else "not loaded"} (via http.client)')
+
+        cold = []
+        warm = []
+        for _ in range(args.runs):
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            cold.append(boot_seconds(env))
+            warm.append(boot_seconds(env))
+        print(f'boot, cold template cache: {statistics.median(cold) * 1000:.1f} ms')
+        print(f'boot, warm template cache: {statistics.median(warm) * 1000:.1f} ms')
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
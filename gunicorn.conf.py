@@ -0,0 +1,65 @@
+"""Production gunicorn settings.
+
+Run with:
+    gunicorn wsgi:app
+
+gunicorn picks this file up automatically from the working directory. Every
+value can be overridden with the environment variables below or on the
+command line.
+"""
+import math
+import os
+
+
+def _available_cpus():
+    # cpu_count() reports the host; containers are limited by affinity or a cgroup quota.
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+_cpus = _available_cpus()
+
+bind = os.environ.get('GUNICORN_BIND') or f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# Most slow requests (portfolio analysis, SMTP/Twilio, uploads) wait on I/O,
+# so a few processes with several threads each go further than many sync workers.
+# Threads supply the concurrency; each extra process costs a full copy of
+# Flask, SQLAlchemy and Pillow, so stay at about one process per CPU.
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', min(max(_cpus, 2), 4)))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Recycle workers now and then; the jitter stops them all restarting at once.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+# Preloading runs init_db() once in the master instead of racing in every worker,
+# and lets the master compile templates before forking.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+if preload_app:
+    os.environ.setdefault('PREWARM_TEMPLATES', '1')
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def post_fork(server, worker):
+    # Pooled connections opened in the master must not be shared with the children.
+    if not server.cfg.preload_app:
+        return
+    from app import app, db
+
+    with app.app_context():
+        db.engine.dispose(close=False)
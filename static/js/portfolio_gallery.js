@@ -0,0 +1,86 @@
+(() => {
+  const gallery = document.querySelector('.portfolio-gallery');
+  const sentinel = document.querySelector('.portfolio-sentinel');
+  if (!gallery || !sentinel) return;
+
+  const apiUrl = gallery.getAttribute('data-api-url');
+  let cursor = gallery.getAttribute('data-next-cursor') || '';
+  if (!apiUrl || !cursor) return;
+
+  let loading = false;
+
+  const side = (url, label, badgeClass) => {
+    const col = document.createElement('div');
+    col.className = 'col-6 position-relative';
+
+    const link = document.createElement('a');
+    link.href = url;
+    link.target = '_blank';
+    link.className = 'text-decoration-none';
+
+    const img = document.createElement('img');
+    img.src = url;
+    img.alt = label;
+    img.className = 'w-100';
+    img.loading = 'lazy';
+    img.decoding = 'async';
+    img.style.height = '260px';
+    img.style.objectFit = 'cover';
+    link.appendChild(img);
+
+    const badge = document.createElement('span');
+    badge.className = `badge ${badgeClass} position-absolute top-0 start-0 m-2`;
+    badge.textContent = label;
+
+    col.appendChild(link);
+    col.appendChild(badge);
+    return col;
+  };
+
+  const card = (group) => {
+    const outer = document.createElement('div');
+    outer.className = 'col-12 col-lg-6';
+    outer.innerHTML = '<div class="card h-100 border-0 shadow-sm"><div class="row g-0"></div></div>';
+    const row = outer.querySelector('.row');
+    row.appendChild(side(group.before, 'Before', 'bg-navy'));
+    row.appendChild(side(group.after, 'After', 'bg-gold text-dark'));
+    return outer;
+  };
+
+  const finish = (observer) => {
+    observer.disconnect();
+    sentinel.remove();
+  };
+
+  const loadMore = async (observer) => {
+    if (loading || !cursor) return;
+    loading = true;
+    try {
+      const resp = await fetch(`${apiUrl}?cursor=${encodeURIComponent(cursor)}`);
+      if (!resp.ok) throw new Error(`HTTP ${resp.status}`);
+      const data = await resp.json();
+      (data.groups || []).forEach((group) => gallery.appendChild(card(group)));
+      cursor = data.next_cursor || '';
+      if (!cursor) finish(observer);
+    } catch {
+      observer.disconnect();
+      sentinel.textContent = 'Could not load more projects. Refresh the page to try again.';
+      return;
+    } finally {
+      loading = false;
+    }
+    // The sentinel may still be on screen after a short page; keep going.
+    const rect = sentinel.getBoundingClientRect();
+    if (cursor && rect.top < window.innerHeight) loadMore(observer);
+  };
+
+  if (!('IntersectionObserver' in window)) {
+    sentinel.remove();
+    return;
+  }
+
+  const observer = new IntersectionObserver((entries) => {
+    if (entries.some((entry) => entry.isIntersecting)) loadMore(observer);
+  }, { rootMargin: '400px 0px' });
+  observer.observe(sentinel);
+})();
@@ -1,4 +1,13 @@
-from app import app, init_db
+import os
+
+from app import app, init_db, prewarm_portfolio, prewarm_templates
 
 init_db()
 
+# Under `gunicorn --preload` this runs once in the master, before workers fork.
+if os.environ.get('PREWARM_TEMPLATES', '0') == '1':
+    prewarm_templates()
+
+# Opt-in: analyses every portfolio image (and imports Pillow) before the port is bound.
+if os.environ.get('PREWARM_PORTFOLIO', '0') == '1':
+    prewarm_portfolio()